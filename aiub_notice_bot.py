@@ -1,7 +1,13 @@
 import requests
-from bs4 import BeautifulSoup
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree, html as lxml_html
 import os
 import sys
+import json
+import hashlib
+from array import array
 import time
 import logging
 from urllib.parse import urljoin
@@ -12,13 +18,34 @@ CHAT_ID = os.environ.get("CHAT_ID")
 URL = "https://www.aiub.edu/category/notices"
 TIMEOUT = 30  # seconds for HTTP requests
 MAX_RETRIES = 3  # retry count for transient failures
-RETRY_DELAY = 5  # seconds between retries
+RETRY_BACKOFF = 1  # exponential backoff factor between retries (seconds)
 MAX_SAVED_NOTICES = 200  # cap state file to avoid unbounded growth
+MAX_MESSAGE_LENGTH = 4096  # Telegram's limit on a single message body
 
 # Resolve paths relative to the script's directory so the bot works
 # regardless of the working directory it is invoked from.
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-STATE_FILE = os.path.join(SCRIPT_DIR, "last_notice.txt")
+# Seen titles are stored as packed 64-bit BLAKE2b digests; the page's cache
+# validators live in a small JSON file next to them.
+STATE_FILE = os.path.join(SCRIPT_DIR, "last_notice.bin")
+VALIDATORS_FILE = os.path.join(SCRIPT_DIR, "last_notice.json")
+
+# Page structure: precompiled XPath equivalents of the notice selectors.
+def _has_class(name):
+    """XPath predicate matching elements whose class list contains *name*."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+FIND_ITEMS = etree.XPath(
+    f"//*[{_has_class('event-item')} or {_has_class('notice-item')} or self::article]"
+)
+FIND_TITLES = etree.XPath(f".//h2[{_has_class('title')}]")
+FIND_DATES = etree.XPath(
+    f".//*[{_has_class('date')} or self::time or {_has_class('event-date')}]"
+)
+FIND_PARENT_ANCHOR = etree.XPath("ancestor::a[1]")
+FIND_ITEM_ANCHOR = etree.XPath("(.//a[@href])[1]")
+HTML_PARSER = lxml_html.HTMLParser(encoding="utf-8")
 
 # Logging
 logging.basicConfig(
@@ -27,37 +54,69 @@ logging.basicConfig(
 )
 log = logging.getLogger(__name__)
 
+# HTTP session used for scraping so the TCP/TLS connection to aiub.edu is
+# reused across calls.
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": (
+        "Mozilla/5.0 (compatible; AIUBNoticeBot/1.0; "
+        "+https://github.com)"
+    )
+})
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=[502, 503, 504],
+    ),
+))
+
+# Telegram is a single JSON endpoint, so talk to it through a bare urllib3
+# pool and skip the requests Session/adapter layer.
+POOL = urllib3.PoolManager(
+    maxsize=4,
+    retries=Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+    ),
+)
+
 
 # Helpers
+# Maps each MarkdownV2 special character to its backslash-escaped form.
+_MDV2_TABLE = str.maketrans({ch: "\\" + ch for ch in r"_*[]()~`>#+-=|{}.!\\"})
+
+
 def escape_markdown_v2(text):
     """Escape all special characters required by Telegram MarkdownV2."""
-    special = r"_*[]()~`>#+-=|{}.!\\"
-    return "".join(f"\\{ch}" if ch in special else ch for ch in text)
+    return text.translate(_MDV2_TABLE)
+
 
+def _request_with_retry(method, url, **kwargs):
+    """Perform an HTTP request through SESSION.
 
-def _request_with_retry(method, url, *, retries=MAX_RETRIES, **kwargs):
-    """Perform an HTTP request with retries on transient failures."""
+    Transient failures are retried with backoff by the session's adapter
+    (which also honours ``Retry-After``); anything left over is logged and
+    re-raised.
+    """
     kwargs.setdefault("timeout", TIMEOUT)
-    last_exc = None
-    for attempt in range(1, retries + 1):
-        try:
-            resp = method(url, **kwargs)
-            resp.raise_for_status()
-            return resp
-        except requests.RequestException as exc:
-            last_exc = exc
-            if attempt < retries:
-                log.warning(
-                    "Request to %s failed (attempt %d/%d): %s – retrying in %ds",
-                    url, attempt, retries, exc, RETRY_DELAY,
-                )
-                time.sleep(RETRY_DELAY)
-            else:
-                log.error(
-                    "Request to %s failed after %d attempts: %s",
-                    url, retries, exc,
-                )
-    raise last_exc
+    try:
+        resp = SESSION.request(method, url, **kwargs)
+    except requests.RequestException as exc:
+        log.error("Request to %s failed: %s", url, exc)
+        raise
+    try:
+        resp.raise_for_status()
+    except requests.RequestException as exc:
+        # Release the connection of a stream=True response before bailing out.
+        resp.close()
+        log.error("Request to %s failed: %s", url, exc)
+        raise
+    return resp
 
 
 # Telegram
@@ -70,80 +129,193 @@ def send_telegram_msg(message):
         "parse_mode": "MarkdownV2",
     }
     try:
-        resp = _request_with_retry(requests.post, send_url, data=payload)
-        return resp.ok
-    except requests.RequestException:
+        resp = POOL.request("POST", send_url, json=payload, timeout=TIMEOUT)
+    except urllib3.exceptions.HTTPError as exc:
+        log.error("Telegram request failed: %s", exc)
+        return False
+    if resp.status >= 400:
+        log.error("Telegram returned HTTP %d: %s", resp.status, resp.data[:200])
         return False
+    return True
+
+
+# Message formatting
+def format_notice(title, link, date):
+    """Format a single notice as a MarkdownV2 alert."""
+    safe_title = escape_markdown_v2(title)
+    safe_link = escape_markdown_v2(link)
+    date_str = f"\U0001f4c5 {escape_markdown_v2(date)}\n\n" if date else ""
+    return (
+        "\U0001f6a8 *New AIUB Notice\\!*\n\n"
+        f"{date_str}"
+        f"_{safe_title}_\n\n"
+        f"[Click to Read]({safe_link})"
+    )
+
+
+def format_digest(notices):
+    """Format several notices as a numbered MarkdownV2 digest.
+
+    Returns a list of message bodies, split so that none exceeds
+    MAX_MESSAGE_LENGTH.
+    """
+    header = f"\U0001f6a8 *{len(notices)} New AIUB Notices\\!*\n"
+    messages = []
+    lines = [header]
+    length = len(header)
+    for i, (title, link, date) in enumerate(notices, 1):
+        safe_title = escape_markdown_v2(title)
+        safe_link = escape_markdown_v2(link)
+        date_str = f" \\({escape_markdown_v2(date)}\\)" if date else ""
+        line = f"{i}\\. [{safe_title}]({safe_link}){date_str}\n"
+        # +1 for the newline used to join lines.
+        if i > 1 and length + len(line) + 1 > MAX_MESSAGE_LENGTH:
+            messages.append("\n".join(lines))
+            lines = []
+            length = -1
+        lines.append(line)
+        length += len(line) + 1
+    messages.append("\n".join(lines))
+    return messages
 
 
 # Scraping
-def get_all_notices():
+def get_all_notices(validators=None):
     """Scrape ALL notices from the AIUB notices page.
 
-    Returns a list of (title, link, date) tuples. Raises on network errors so the
-    caller can decide how to handle them.
+    *validators* holds the "etag"/"last_modified" of the previous fetch and
+    is sent as a conditional GET. Returns a (notices, validators) tuple where
+    notices is a list of (title, link, date) tuples, or None if the page has
+    not been modified. Raises on network errors so the caller can decide how
+    to handle them.
     """
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (compatible; AIUBNoticeBot/1.0; "
-            "+https://github.com)"
-        )
-    }
-    resp = _request_with_retry(requests.get, URL, headers=headers)
-    soup = BeautifulSoup(resp.content, "html.parser")
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    # Stream the body straight into lxml rather than buffering resp.content.
+    with _request_with_retry("GET", URL, headers=headers, stream=True) as resp:
+        if resp.status_code == 304:
+            return None, validators
+        new_validators = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+        resp.raw.decode_content = True
+        try:
+            tree = lxml_html.parse(resp.raw, parser=HTML_PARSER).getroot()
+        except urllib3.exceptions.HTTPError as exc:
+            # The body is read by lxml, outside requests, so surface network
+            # failures mid-body as the RequestException callers expect.
+            log.error("Reading %s failed: %s", URL, exc)
+            raise requests.exceptions.ConnectionError(exc) from exc
+
+    # An empty or non-HTML body has no root element.
+    if tree is None:
+        return [], new_validators
 
     notices = []
-    for item in soup.select(".event-item, .notice-item, article"):
-        title_el = item.select_one("h2.title")
-        if not title_el:
+    for item in FIND_ITEMS(tree):
+        title_els = FIND_TITLES(item)
+        if not title_els:
             continue
-        title = title_el.get_text().strip()
+        title_el = title_els[0]
+        title = title_el.text_content().strip()
         if not title:
             continue
-        link_tag = title_el.find_parent("a") or item.select_one("a[href]")
-        link = urljoin("https://www.aiub.edu", link_tag["href"]) if link_tag else URL
-        date_el = item.select_one(".date, time, .event-date")
-        date = date_el.get_text().strip() if date_el else ""
+        link_tags = FIND_PARENT_ANCHOR(title_el) or FIND_ITEM_ANCHOR(item)
+        link = urljoin("https://www.aiub.edu", link_tags[0].get("href", "")) if link_tags else URL
+        date_els = FIND_DATES(item)
+        date = date_els[0].text_content().strip() if date_els else ""
         notices.append((title, link, date))
 
     # Fallback to old method if new selectors don't work
     if not notices:
-        for title_element in soup.select("h2.title"):
-            title = title_element.get_text().strip()
+        for title_element in FIND_TITLES(tree):
+            title = title_element.text_content().strip()
             if not title:
                 continue
-            link_tag = title_element.find_parent("a")
-            link = urljoin("https://www.aiub.edu", link_tag["href"]) if link_tag else URL
+            link_tags = FIND_PARENT_ANCHOR(title_element)
+            link = urljoin("https://www.aiub.edu", link_tags[0].get("href", "")) if link_tags else URL
             notices.append((title, link, ""))
 
-    return notices
+    return notices, new_validators
 
 
 # State Persistence
+def title_hash(title):
+    """Return the 64-bit BLAKE2b digest of a notice title as an int."""
+    digest = hashlib.blake2b(title.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
 def load_saved_notices():
-    """Load previously seen notice titles from file (one title per line)."""
+    """Load previously seen notice title hashes and page validators from file.
+
+    Returns a (hashes, validators) tuple; hashes is a list ordered oldest
+    first and validators holds the "etag" and "last_modified" of the last
+    fetched page (either may be None).
+    """
+    hashes = array("Q")
     try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            return set(line.strip() for line in f if line.strip())
+        with open(STATE_FILE, "rb") as f:
+            hashes.frombytes(f.read())
+        if sys.byteorder == "big":
+            hashes.byteswap()
     except FileNotFoundError:
-        return set()
-    except OSError as exc:
+        pass
+    except (OSError, ValueError) as exc:
         log.warning("Could not read state file: %s – starting fresh", exc)
-        return set()
+        hashes = array("Q")
+
+    try:
+        with open(VALIDATORS_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        state = {}
+    except (OSError, ValueError) as exc:
+        log.warning("Could not read validators file: %s", exc)
+        state = {}
+    validators = {
+        "etag": state.get("etag"),
+        "last_modified": state.get("last_modified"),
+    }
+    return hashes.tolist(), validators
 
 
-def save_notices(titles):
-    """Save notice titles to file (one per line), capped at MAX_SAVED_NOTICES."""
-    # Keep only the most recent titles to prevent unbounded growth.
-    capped = list(titles)[-MAX_SAVED_NOTICES:]
+def save_notices(hashes, validators):
+    """Save title hashes (oldest first) and page validators.
+
+    Only the newest MAX_SAVED_NOTICES hashes are kept.
+    """
+    capped = array("Q", hashes[-MAX_SAVED_NOTICES:])
+    if sys.byteorder == "big":
+        capped.byteswap()
     try:
-        with open(STATE_FILE, "w", encoding="utf-8") as f:
-            for title in capped:
-                f.write(title + "\n")
+        _write_if_changed(STATE_FILE, capped.tobytes())
+        _write_if_changed(
+            VALIDATORS_FILE, (json.dumps(validators, indent=2) + "\n").encode("utf-8")
+        )
     except OSError as exc:
         log.error("Could not write state file: %s", exc)
 
 
+def _write_if_changed(path, data):
+    """Atomically replace *path* with *data*, skipping the write if it is unchanged."""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return
+    except FileNotFoundError:
+        pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
 # Main
 def main():
     # ---- pre-flight checks ------------------------------------------------
@@ -155,47 +327,69 @@ def main():
         sys.exit(1)
 
     # ---- fetch notices ----------------------------------------------------
-    saved_titles = load_saved_notices()
+    saved_hashes, saved_validators = load_saved_notices()
 
     try:
-        notices = get_all_notices()
+        notices, validators = get_all_notices(saved_validators)
     except requests.RequestException as exc:
         log.error("Failed to fetch notices: %s", exc)
         sys.exit(1)
 
+    if notices is None:
+        log.info("Notices page not modified – no new notices.")
+        return
+
     if not notices:
         log.info("No notices found on page – the page structure may have changed.")
         return
 
-    current_titles = [title for title, _, _ in notices]
-    new_notices = [(t, l, d) for t, l, d in notices if t not in saved_titles]
+    # Single pass: hash each title once, collecting both the current page's
+    # hashes and the notices not seen before.
+    saved_set = set(saved_hashes)
+    current_hashes = {}  # insertion-ordered set, newest first like the page
+    new_notices = []
+    for notice in notices:
+        h = title_hash(notice[0])
+        current_hashes[h] = None
+        if h not in saved_set:
+            new_notices.append(notice)
+
+    # Hashes to persist, oldest first. The current page always goes last so
+    # the cap can never evict a notice that is still listed (which would
+    # re-alert it on the next run), and the order stays stable between runs.
+    hashes_to_save = (
+        [h for h in saved_hashes if h not in current_hashes]
+        + list(reversed(current_hashes))
+    )
 
     if not new_notices:
         log.info("No new notices.")
+        if validators != saved_validators:
+            save_notices(hashes_to_save, validators)
         return
 
     # ---- send notifications (oldest first) --------------------------------
-    all_sent = True
-    for i, (title, link, date) in enumerate(reversed(new_notices)):
+    # A single new notice keeps the full alert format; a backlog is
+    # coalesced into a digest so it costs one request instead of N.
+    oldest_first = list(reversed(new_notices))
+    for title, _, _ in oldest_first:
         log.info("New notice: %s", title)
-        safe_title = escape_markdown_v2(title)
-        safe_link = escape_markdown_v2(link)
-        date_str = f"\U0001f4c5 {escape_markdown_v2(date)}\n\n" if date else ""
-        msg = (
-            "\U0001f6a8 *New AIUB Notice\\!*\n\n"
-            f"{date_str}"
-            f"_{safe_title}_\n\n"
-            f"[Click to Read]({safe_link})"
-        )
+    if len(oldest_first) == 1:
+        messages = [format_notice(*oldest_first[0])]
+    else:
+        messages = format_digest(oldest_first)
+
+    all_sent = True
+    for i, msg in enumerate(messages):
         if not send_telegram_msg(msg):
-            log.error("Failed to send notification for: %s", title)
+            log.error("Failed to send notification message %d/%d", i + 1, len(messages))
             all_sent = False
-        elif i < len(new_notices) - 1:
+        elif i < len(messages) - 1:
             time.sleep(0.5)  # Brief delay to avoid Telegram rate limits
 
     # ---- persist state only when every message was delivered ---------------
     if all_sent:
-        save_notices(set(current_titles) | saved_titles)
+        save_notices(hashes_to_save, validators)
     else:
         log.warning(
             "Some messages failed to send – state NOT updated so they "
@@ -1,15 +1,76 @@
-from http.server import BaseHTTPRequestHandler
 import os
-import json
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, parse_qs, urlparse
+import orjson
+import time
+import contextlib
+import functools
+import httpx
+from lxml import etree, html as lxml_html
+from urllib.parse import urljoin
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
 AIUB_URL = "https://www.aiub.edu/category/notices"
+CACHE_TTL = 60  # seconds a scraped notice list is shared between commands
+
+# Static replies (already MarkdownV2-escaped)
+START_MSG = (
+    "👋 *Welcome to AIUB Notice Bot\\!*\n\n"
+    "Available commands:\n"
+    "/notice \\- Show latest 5 notices\n"
+    "/latest \\- Show the most recent notice\n"
+    "/search \\<keyword\\> \\- Search notices\n"
+    "/devInfo \\- Show developer info\n"
+    "/help \\- Show this message"
+)
+DEV_INFO_MSG = (
+    "👨‍💻 *Developer Information*\n\n"
+    "*Name:* Syed Shafkat Raiyan\n\n"
+    "🔗 *Connect with me:*\n"
+    "[GitHub](https://github.com/shafkat\\-raiyan)\n"
+    "[LinkedIn](https://www.linkedin.com/in/shafkat\\-raiyan)"
+)
+
+
+def new_client():
+    """Create the async HTTP client used to serve one request.
+
+    Pooled connections are bound to the event loop that opened them, and
+    Vercel runs each invocation on a fresh loop, so a client must not outlive
+    the request that created it. Within a request it still reuses (HTTP/2)
+    connections to aiub.edu and api.telegram.org.
+    """
+    return httpx.AsyncClient(
+        headers={"User-Agent": "Mozilla/5.0 (compatible; AIUBNoticeBot/1.0)"},
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=10),
+            retries=3,  # retries connection failures only
+        ),
+    )
+
+
+# Page structure: precompiled XPath equivalents of the notice selectors.
+def _has_class(name):
+    """XPath predicate matching elements whose class list contains *name*."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
 
+FIND_ITEMS = etree.XPath(
+    f"//*[{_has_class('event-item')} or {_has_class('notice-item')} or self::article]"
+)
+FIND_TITLES = etree.XPath(f".//h2[{_has_class('title')}]")
+FIND_DATES = etree.XPath(
+    f".//*[{_has_class('date')} or self::time or {_has_class('event-date')}]"
+)
+FIND_PARENT_ANCHOR = etree.XPath("ancestor::a[1]")
+FIND_ITEM_ANCHOR = etree.XPath("(.//a[@href])[1]")
+ITEM_CLASSES = {"event-item", "notice-item"}
 
-def set_bot_commands():
+
+async def set_bot_commands(client):
     """Register bot commands with Telegram so they appear in the menu."""
     url = f"https://api.telegram.org/bot{BOT_TOKEN}/setMyCommands"
     commands = [
@@ -19,57 +80,163 @@ def set_bot_commands():
         {"command": "devinfo", "description": "Information of the developer"},
         {"command": "help", "description": "Show available commands"},
     ]
-    resp = requests.post(url, json={"commands": commands}, timeout=10)
-    return resp.ok
+    resp = await client.post(url, json={"commands": commands}, timeout=10)
+    return resp.is_success
 
 
-def escape_markdown_v2(text):
-    """Escape all special characters required by Telegram MarkdownV2."""
-    special = r"_*[]()~`>#+-=|{}.!\\"
-    return "".join(f"\\{ch}" if ch in special else ch for ch in text)
+# Maps each MarkdownV2 special character to its backslash-escaped form.
+_MDV2_TABLE = str.maketrans({ch: "\\" + ch for ch in r"_*[]()~`>#+-=|{}.!\\"})
 
 
-def get_notices(limit=10):
+@functools.lru_cache(maxsize=256)
+def escape_markdown_v2(text):
+    """Escape all special characters required by Telegram MarkdownV2."""
+    return text.translate(_MDV2_TABLE)
+
+
+# Last scrape result for this (warm) instance, plus the validators needed
+# to revalidate it with a conditional GET once it expires.
+_CACHE = {"t": 0.0, "v": None, "etag": None, "last_modified": None}
+
+
+async def get_notices(client, limit=10):
+    """Return up to *limit* notices as (title, link, date) tuples.
+
+    Results are cached for CACHE_TTL seconds so a burst of commands shares
+    one fetch and parse.
+    """
+    now = time.monotonic()
+    if _CACHE["v"] and now - _CACHE["t"] < CACHE_TTL:
+        return _CACHE["v"][:limit]
+    notices = await _scrape_notices(client)
+    _CACHE.update(t=now, v=notices)
+    return notices[:limit]
+
+
+async def get_latest_notice(client):
+    """Return the most recent notice as a (title, link, date) tuple, or None.
+
+    Uses the cached list when fresh; otherwise parses the page only up to the
+    first notice.
+    """
+    now = time.monotonic()
+    if _CACHE["v"] and now - _CACHE["t"] < CACHE_TTL:
+        return _CACHE["v"][0]
+    async with _open_page(client) as resp:
+        if resp.status_code == 304:
+            _CACHE["t"] = now
+            return _CACHE["v"][0]
+        return await _first_notice(resp)
+
+
+@contextlib.asynccontextmanager
+async def _open_page(client):
+    """Stream the notices page, revalidating the cached list if there is one."""
+    headers = {}
+    if _CACHE["v"]:
+        if _CACHE["etag"]:
+            headers["If-None-Match"] = _CACHE["etag"]
+        if _CACHE["last_modified"]:
+            headers["If-Modified-Since"] = _CACHE["last_modified"]
+    async with client.stream("GET", AIUB_URL, headers=headers, timeout=30) as resp:
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        yield resp
+
+
+async def _scrape_notices(client):
     """Scrape notices from AIUB website. Returns list of (title, link, date) tuples."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; AIUBNoticeBot/1.0)"
-    }
-    resp = requests.get(AIUB_URL, headers=headers, timeout=30)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.content, "html.parser")
+    async with _open_page(client) as resp:
+        if resp.status_code == 304:
+            return _CACHE["v"]
+        # Feed the body to lxml as it arrives instead of buffering it first.
+        parser = lxml_html.HTMLParser(encoding="utf-8")
+        async for chunk in resp.aiter_bytes():
+            parser.feed(chunk)
+        try:
+            tree = parser.close()
+        except etree.XMLSyntaxError:
+            tree = None
+        # An empty or non-HTML body has no root element.
+        if tree is None:
+            return []
+        _CACHE.update(
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+        )
 
     notices = []
-    for item in soup.select(".event-item, .notice-item, article"):
-        title_el = item.select_one("h2.title")
-        if not title_el:
-            continue
-        title = title_el.get_text().strip()
-        if not title:
-            continue
-        link_tag = title_el.find_parent("a") or item.select_one("a[href]")
-        link = urljoin("https://www.aiub.edu", link_tag["href"]) if link_tag else AIUB_URL
-        date_el = item.select_one(".date, time, .event-date")
-        date = date_el.get_text().strip() if date_el else ""
-        notices.append((title, link, date))
-        if len(notices) >= limit:
-            break
+    for item in FIND_ITEMS(tree):
+        notice = _parse_item(item)
+        if notice:
+            notices.append(notice)
 
     # Fallback to old method if new selectors don't work
     if not notices:
-        for title_element in soup.select("h2.title"):
-            title = title_element.get_text().strip()
-            if not title:
-                continue
-            link_tag = title_element.find_parent("a")
-            link = urljoin("https://www.aiub.edu", link_tag["href"]) if link_tag else AIUB_URL
-            notices.append((title, link, ""))
-            if len(notices) >= limit:
-                break
+        for title_element in FIND_TITLES(tree):
+            notice = _parse_title(title_element)
+            if notice:
+                notices.append(notice)
 
     return notices
 
 
-def send_message(chat_id, text, parse_mode="MarkdownV2", preview=False):
+async def _first_notice(resp):
+    """Parse *resp* only as far as the first notice. Returns a tuple or None.
+
+    The rest of the body is never downloaded once a notice has been found.
+    """
+    parser = etree.HTMLPullParser(events=("end",), encoding="utf-8")
+    chunks = resp.aiter_bytes()
+    first_title = None
+    while True:
+        chunk = await anext(chunks, None)
+        if chunk is None:
+            try:
+                parser.close()
+            except etree.XMLSyntaxError:
+                return None  # empty or non-HTML body
+        else:
+            parser.feed(chunk)
+        for _, el in parser.read_events():
+            if el.tag == "article" or ITEM_CLASSES.intersection((el.get("class") or "").split()):
+                notice = _parse_item(el)
+                if notice:
+                    return notice
+            elif first_title is None and el.tag == "h2" and "title" in (el.get("class") or "").split():
+                first_title = _parse_title(el)
+        if chunk is None:
+            # No item matched: fall back to the first h2.title, as get_notices does.
+            return first_title
+
+
+def _parse_item(item):
+    """Extract (title, link, date) from a notice item element, or None."""
+    title_els = FIND_TITLES(item)
+    if not title_els:
+        return None
+    title_el = title_els[0]
+    title = "".join(title_el.itertext()).strip()
+    if not title:
+        return None
+    link_tags = FIND_PARENT_ANCHOR(title_el) or FIND_ITEM_ANCHOR(item)
+    link = urljoin("https://www.aiub.edu", link_tags[0].get("href", "")) if link_tags else AIUB_URL
+    date_els = FIND_DATES(item)
+    date = "".join(date_els[0].itertext()).strip() if date_els else ""
+    return title, link, date
+
+
+def _parse_title(title_el):
+    """Extract (title, link, "") from a bare h2.title element, or None."""
+    title = "".join(title_el.itertext()).strip()
+    if not title:
+        return None
+    link_tags = FIND_PARENT_ANCHOR(title_el)
+    link = urljoin("https://www.aiub.edu", link_tags[0].get("href", "")) if link_tags else AIUB_URL
+    return title, link, ""
+
+
+async def send_message(client, chat_id, text, parse_mode="MarkdownV2", preview=False):
     """Send a message via Telegram Bot API."""
     url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
     payload = {
@@ -78,15 +245,15 @@ def send_message(chat_id, text, parse_mode="MarkdownV2", preview=False):
         "parse_mode": parse_mode,
         "disable_web_page_preview": not preview,
     }
-    requests.post(url, json=payload, timeout=10)
+    await client.post(url, json=payload, timeout=10)
 
 
-def handle_notice_command(chat_id):
+async def handle_notice_command(client, chat_id):
     """Handle /notice command - show latest 5 notices."""
     try:
-        notices = get_notices(limit=5)
+        notices = await get_notices(client, limit=5)
         if not notices:
-            send_message(chat_id, "No notices found\\.", "MarkdownV2")
+            await send_message(client, chat_id, "No notices found\\.", "MarkdownV2")
             return
 
         lines = ["📋 *Latest AIUB Notices*\n"]
@@ -96,68 +263,52 @@ def handle_notice_command(chat_id):
             date_str = f" \\({escape_markdown_v2(date)}\\)" if date else ""
             lines.append(f"{i}\\. [{safe_title}]({safe_link}){date_str}\n")
 
-        send_message(chat_id, "\n".join(lines))
+        await send_message(client, chat_id, "\n".join(lines))
     except Exception as e:
-        send_message(chat_id, f"Error fetching notices: {escape_markdown_v2(str(e))}")
+        await send_message(client, chat_id, f"Error fetching notices: {escape_markdown_v2(str(e))}")
 
 
-def handle_latest_command(chat_id):
+async def handle_latest_command(client, chat_id):
     """Handle /latest command - show the most recent notice with link preview."""
     try:
-        notices = get_notices(limit=1)
-        if not notices:
-            send_message(chat_id, "No notices found\\.", "MarkdownV2")
+        notice = await get_latest_notice(client)
+        if not notice:
+            await send_message(client, chat_id, "No notices found\\.", "MarkdownV2")
             return
 
-        title, link, date = notices[0]
+        title, link, date = notice
         safe_title = escape_markdown_v2(title)
         safe_link = escape_markdown_v2(link)
         date_str = f"📅 {escape_markdown_v2(date)}\n\n" if date else ""
         msg = f"🔔 *Latest Notice*\n\n{date_str}_{safe_title}_\n\n[Click to Read]({safe_link})"
-        send_message(chat_id, msg, preview=True)
+        await send_message(client, chat_id, msg, preview=True)
     except Exception as e:
-        send_message(chat_id, f"Error: {escape_markdown_v2(str(e))}")
+        await send_message(client, chat_id, f"Error: {escape_markdown_v2(str(e))}")
 
 
-def handle_start_command(chat_id):
+async def handle_start_command(client, chat_id):
     """Handle /start command - show welcome message."""
-    msg = (
-        "👋 *Welcome to AIUB Notice Bot\\!*\n\n"
-        "Available commands:\n"
-        "/notice \\- Show latest 5 notices\n"
-        "/latest \\- Show the most recent notice\n"
-        "/search \\<keyword\\> \\- Search notices\n"
-        "/devInfo \\- Show developer info\n"
-        "/help \\- Show this message"
-    )
-    send_message(chat_id, msg)
+    await send_message(client, chat_id, START_MSG)
 
 
-def handle_dev_info_command(chat_id):
+async def handle_dev_info_command(client, chat_id):
     """Handle /devInfo command - show developer information."""
-    msg = (
-        "👨‍💻 *Developer Information*\n\n"
-        "*Name:* Syed Shafkat Raiyan\n\n"
-        "🔗 *Connect with me:*\n"
-        "[GitHub](https://github.com/shafkat\-raiyan)\n"
-        "[LinkedIn](https://www.linkedin.com/in/shafkat\-raiyan)"
-    )
-    send_message(chat_id, msg)
+    await send_message(client, chat_id, DEV_INFO_MSG)
 
 
-def handle_search_command(chat_id, query):
+async def handle_search_command(client, chat_id, query):
     """Handle /search command - search notices by keyword."""
     if not query:
-        send_message(chat_id, "Usage: /search \\<keyword\\>\nExample: /search exam")
+        await send_message(client, chat_id, "Usage: /search \\<keyword\\>\nExample: /search exam")
         return
 
     try:
-        notices = get_notices(limit=20)
+        notices = await get_notices(client, limit=20)
         query_lower = query.lower()
         matches = [(t, l, d) for t, l, d in notices if query_lower in t.lower()]
 
         if not matches:
-            send_message(chat_id, f"No notices found matching \"{escape_markdown_v2(query)}\"")
+            await send_message(client, chat_id, f"No notices found matching \"{escape_markdown_v2(query)}\"")
             return
 
         lines = [f"🔍 *Search results for \"{escape_markdown_v2(query)}\"*\n"]
@@ -170,12 +321,36 @@ def handle_search_command(chat_id, query):
         if len(matches) > 5:
             lines.append(f"\n_\\+{len(matches) - 5} more results_")
 
-        send_message(chat_id, "\n".join(lines))
+        await send_message(client, chat_id, "\n".join(lines))
     except Exception as e:
-        send_message(chat_id, f"Error: {escape_markdown_v2(str(e))}")
+        await send_message(client, chat_id, f"Error: {escape_markdown_v2(str(e))}")
+
 
+def _command_key(text):
+    """Return the command of a message, without any @botname suffix."""
+    head = text.split(None, 1)[0]
+    return head.split("@", 1)[0].lower()
 
-def process_update(body):
+
+def _search_query(text):
+    """Return the keyword part of a /search message."""
+    return text.split(maxsplit=1)[1] if " " in text else ""
+
+
+# Command -> coroutine factory taking (client, chat_id, text).
+COMMANDS = {
+    "/notice": lambda client, chat_id, _: handle_notice_command(client, chat_id),
+    "/latest": lambda client, chat_id, _: handle_latest_command(client, chat_id),
+    "/start": lambda client, chat_id, _: handle_start_command(client, chat_id),
+    "/help": lambda client, chat_id, _: handle_start_command(client, chat_id),
+    "/devinfo": lambda client, chat_id, _: handle_dev_info_command(client, chat_id),
+    "/search": lambda client, chat_id, text: handle_search_command(
+        client, chat_id, _search_query(text)
+    ),
+}
+
+
+async def process_update(client, body):
     """Process a Telegram update."""
     if not body or "message" not in body:
         return
@@ -188,53 +363,51 @@ def process_update(body):
         return
 
     # Route commands
-    if text == "/notice" or text.startswith("/notice@"):
-        handle_notice_command(chat_id)
-    elif text == "/latest" or text.startswith("/latest@"):
-        handle_latest_command(chat_id)
-    elif text in ("/start", "/help") or text.startswith(("/start@", "/help@")):
-        handle_start_command(chat_id)
-    elif text.lower() == "/devinfo" or text.lower().startswith("/devinfo@"):
-        handle_dev_info_command(chat_id)
-    elif text.startswith("/search"):
-        query = text.split(maxsplit=1)[1] if " " in text else ""
-        handle_search_command(chat_id, query)
-
-
-class handler(BaseHTTPRequestHandler):
-    def do_POST(self):
-        content_length = int(self.headers.get("Content-Length", 0))
-        body = self.rfile.read(content_length)
-        
-        try:
-            data = json.loads(body)
-            process_update(data)
-        except:
-            pass
-
-        self.send_response(200)
-        self.send_header("Content-Type", "text/plain")
-        self.end_headers()
-        self.wfile.write(b"OK")
-
-    def do_GET(self):
-        # Parse query parameters
-        parsed = urlparse(self.path)
-        params = parse_qs(parsed.query)
-        
-        # Check if setup action is requested
-        if params.get("action") == ["setup"]:
-            success = set_bot_commands()
-            self.send_response(200)
-            self.send_header("Content-Type", "text/plain")
-            self.end_headers()
-            if success:
-                self.wfile.write(b"Bot commands registered successfully!")
-            else:
-                self.wfile.write(b"Failed to register bot commands.")
-            return
-        
-        self.send_response(200)
-        self.send_header("Content-Type", "text/plain")
-        self.end_headers()
-        self.wfile.write(b"AIUB Notice Bot Webhook is running")
+    command = COMMANDS.get(_command_key(text))
+    if command:
+        await command(client, chat_id, text)
+
+
+async def _process_update_quietly(data):
+    """Run process_update, swallowing errors so Telegram never sees them."""
+    try:
+        async with new_client() as client:
+            await process_update(client, data)
+    except Exception:
+        pass
+
+
+async def post(request):
+    """Receive a Telegram update.
+
+    The update is handled in a background task after the response is sent.
+    Under a long-running ASGI server (e.g. uvicorn), Telegram gets its 200
+    before the scrape and reply run. This has no effect on Vercel: its ASGI
+    bridge runs the whole call, background task included, before returning
+    the response, so Telegram still waits for the scrape and reply there.
+    """
+    try:
+        data = orjson.loads(await request.body())
+    except Exception:
+        return PlainTextResponse("OK")
+    return PlainTextResponse("OK", background=BackgroundTask(_process_update_quietly, data))
+
+
+async def get(request):
+    """Health check; ``?action=setup`` registers the bot commands."""
+    if request.query_params.get("action") == "setup":
+        async with new_client() as client:
+            registered = await set_bot_commands(client)
+        if registered:
+            return PlainTextResponse("Bot commands registered successfully!")
+        return PlainTextResponse("Failed to register bot commands.")
+    return PlainTextResponse("AIUB Notice Bot Webhook is running")
+
+
+# Vercel forwards /api/webhook here, so match on method for any path.
+app = Starlette(
+    routes=[
+        Route("/{path:path}", post, methods=["POST"]),
+        Route("/{path:path}", get, methods=["GET"]),
+    ],
+)